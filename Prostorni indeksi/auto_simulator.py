@@ -1,4 +1,27 @@
-from geopy.distance import geodesic
+from collections import namedtuple
+
+import numpy as np
+
+# Srednji poluprečnik Zemlje u metrima (za haversine formulu)
+POLUPRECNIK_ZEMLJE_M = 6371000.0
+
+
+# Vraća dužine svih segmenata rute u metrima, izračunate jednom vektorskom haversine formulom
+#    cos_lat: opciono, unapred izračunat cos(latitude) za svaki čvor rute
+def segment_lengths(route_coords, cos_lat=None):
+    arr = np.asarray(route_coords, dtype=np.float64).reshape(-1, 2)
+    if cos_lat is None:
+        cos_lat = np.cos(np.radians(arr[:, 0]))
+    # Razlike se računaju u float64 iz stepeni: u float32 bi greška bila ~0.4 m po segmentu
+    dlat = np.radians(arr[1:, 0] - arr[:-1, 0])
+    dlon = np.radians(arr[1:, 1] - arr[:-1, 1])
+    a = np.sin(dlat / 2) ** 2 + cos_lat[:-1] * cos_lat[1:] * np.sin(dlon / 2) ** 2
+    return 2 * POLUPRECNIK_ZEMLJE_M * np.arcsin(np.sqrt(a))
+
+
+# Informacije o napretku vožnje (lakša od rečnika koji se pravi na svakom koraku)
+ProgressInfo = namedtuple('ProgressInfo', 'segment total_segments segment_progress overall_progress speed_kmh')
+
 
 class AutoSimulator:
      
@@ -18,8 +41,27 @@ class AutoSimulator:
         
         # Izračunaj koliko metara se pomera po svakom koraku
         self.distance_per_step = (self.speed_kmh * 1000 / 3600) * self.interval  # u metrima
+
+        # Koordinate čvorova u radijanima i cos(lat) kao kontinualni float32 nizovi,
+        # spremni za vektorske (SIMD) haversine proračune nad celom rutom
+        coords = np.asarray(route_coords, dtype=np.float32).reshape(-1, 2)
+        self._lat_rad = np.radians(coords[:, 0])
+        self._lon_rad = np.radians(coords[:, 1])
+        self._cos_lat = np.cos(self._lat_rad)
+
+        # Dužine segmenata se ne menjaju tokom vožnje, pa ih računamo samo jednom
+        self._seg_len = segment_lengths(route_coords, cos_lat=self._cos_lat)
+        # Kumulativna dužina rute do početka svakog čvora (za preskakanje više segmenata)
+        self._cum_len = np.concatenate(([0.0], np.cumsum(self._seg_len)))
+        self._recompute_step_tables()
         
 
+    # Preračunava progres po koraku za svaki segment (poziva se pri svakoj promeni brzine)
+    def _recompute_step_tables(self):
+        # Segmenti nulte dužine dobijaju beskonačan progres i preskaču se pri pomeranju
+        with np.errstate(divide='ignore'):
+            self._progress_per_step = self.distance_per_step / self._seg_len
+
     # Vraća trenutnu poziciju automobila (lat, lon) 
     def get_current_position(self):
         
@@ -47,48 +89,28 @@ class AutoSimulator:
             return self.get_current_position()
             
 
-        # Trenutni segment
-        start = self.route_coords[self.current_segment]
-        end = self.route_coords[self.current_segment + 1]
-        
-        # Dužina trenutnog segmenta u metrima
-        segment_length = geodesic(start, end).meters
-        
-        if segment_length == 0:
-            # Ako su dva čvora na istom mestu, pređi na sledeći
-            
-            if debug_print:
-                print(f"Trenutni segment: {self.current_segment}, Duzina: {segment_length}")
-            
-            self.current_segment += 1
-            self.progress = 0.0
-    
-            return self.get_current_position()
-        
-        # Koliko progresa napraviti duž ovog segmenta
-        progress_increment = self.distance_per_step / segment_length   
-        self.progress += progress_increment
+        # Dužina trenutnog segmenta u metrima i unapred izračunat progres po koraku
+        segment_length = self._seg_len[self.current_segment]
+        progress_increment = self._progress_per_step[self.current_segment]
+
+        if self.progress + progress_increment < 1.0:
+            self.progress += progress_increment
+        else:
+            # Prelazimo na sledeći segment (ili više njih u jednom koraku): binarnom
+            # pretragom po kumulativnoj dužini rute nalazimo segment u kome auto staje
+            predjeno = (self._cum_len[self.current_segment] + self.progress * segment_length
+                        + self.distance_per_step)
+            if predjeno >= self._cum_len[-1]:
+                self.current_segment = len(self.route_coords) - 1
+                self.progress = 0.0
+            else:
+                self.current_segment = int(np.searchsorted(self._cum_len, predjeno, side='right')) - 1
+                self.progress = ((predjeno - self._cum_len[self.current_segment])
+                                 / self._seg_len[self.current_segment])
 
         if debug_print:
             print(f"Trenutni segment: {self.current_segment}, Duzina Segmenta: {segment_length}, Step_distance: {self.distance_per_step}, Progres: {self.progress:.2f}, Increment: {progress_increment:.2f}")
-        
-        # Ako smo prešli trenutni segment, pređi na sledeći
-        if self.progress >= 1.0 and self.current_segment < len(self.route_coords) - 1:
-            self.progress = 0.0 #-= 1.0
-            self.current_segment += 1
-            
-            # Ponovo izračunaj za novi segment
-            if self.current_segment < len(self.route_coords) - 1:
-                start = self.route_coords[self.current_segment]
-                end = self.route_coords[self.current_segment + 1]
-                segment_length = geodesic(start, end).meters
-                
-                if segment_length > 0:
-                    progress_increment = segment_length / self.distance_per_step 
-                else:
-                    self.current_segment += 1
-                    self.progress = 0.0
-        
+
         return self.get_current_position()
     
     # Povećaj brzinu za 10 km/h"""
@@ -96,6 +118,7 @@ class AutoSimulator:
         
         self.speed_kmh += 10
         self.distance_per_step = (self.speed_kmh * 1000 / 3600) * self.interval
+        self._recompute_step_tables()
         print(f"Brzina povećana: {self.speed_kmh} km/h")
     
     # Smanji brzinu za 10 km/h"""
@@ -104,6 +127,7 @@ class AutoSimulator:
         if self.speed_kmh > 10:
             self.speed_kmh -= 10
             self.distance_per_step = (self.speed_kmh * 1000 / 3600) * self.interval
+            self._recompute_step_tables()
             print(f"Brzina smanjena: {self.speed_kmh} km/h")
     
     # Proveri da li je automobil stigao na kraj 
@@ -116,10 +140,10 @@ class AutoSimulator:
         
         total_segments = len(self.route_coords) - 1
         overall_progress = (self.current_segment + self.progress) / total_segments * 100
-        return {
-            'segment': self.current_segment,
-            'total_segments': total_segments,
-            'segment_progress': self.progress * 100,
-            'overall_progress': overall_progress,
-            'speed_kmh': self.speed_kmh
-        }
\ No newline at end of file
+        return ProgressInfo(
+            segment=self.current_segment,
+            total_segments=total_segments,
+            segment_progress=self.progress * 100,
+            overall_progress=overall_progress,
+            speed_kmh=self.speed_kmh
+        )
\ No newline at end of file
@@ -4,11 +4,49 @@ import matplotlib
 matplotlib.use('TkAgg')
 # ---------------------------------------------
 
+import functools
+import hashlib
+import os
+import pickle
+
 import osmnx as ox
 from geopy.geocoders import Nominatim
 import matplotlib.pyplot as plt
 import contextily as ctx
-import networkx as nx
+
+from auto_simulator import segment_lengths
+
+# Folder za keširane rezultate geokodiranja i pretrage rute (između pokretanja)
+ROUTE_CACHE_DIR = '.route_cache'
+
+
+def _disk_cache(key):
+    # Pamti rezultat funkcije u pickle fajlu; `key` od argumenata pravi ključ keša
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            digest = hashlib.sha1(repr((func.__name__, key(*args))).encode('utf-8')).hexdigest()
+            path = os.path.join(ROUTE_CACHE_DIR, f"{func.__name__}_{digest}.pkl")
+            if os.path.exists(path):
+                try:
+                    with open(path, 'rb') as f:
+                        result = pickle.load(f)
+                    print(f"{func.__name__}: rezultat učitan iz keša ({path})")
+                    return result
+                except (OSError, EOFError, pickle.UnpicklingError):
+                    # Oštećen keš (npr. prekinut upis) se tretira kao da ga nema
+                    print(f"{func.__name__}: keš {path} je oštećen, rezultat se računa ponovo")
+
+            result = func(*args)
+            os.makedirs(ROUTE_CACHE_DIR, exist_ok=True)
+            # Upis pod privremenim imenom pa preimenovanje, da Ctrl+C ne ostavi nedovršen fajl
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(result, f)
+            os.replace(tmp_path, path)
+            return result
+        return wrapper
+    return decorator
 
 
 def load_serbian_roads():
@@ -17,6 +55,7 @@ def load_serbian_roads():
     return G
 
 
+@_disk_cache(key=lambda start_city, end_city: (start_city, end_city))
 def get_route_coordinates(start_city, end_city):
     # --- ISPRAVLJENA LINIJA: Dodat timeout=10 ---
     geolocator = Nominatim(user_agent="geo_sim", timeout=10)
@@ -52,27 +91,29 @@ def get_route_length(route, G):
 
 
 def show_route_distances(route_coords):
-    total_distance = 0.0
-    from geopy.distance import geodesic
+    # Sve dužine segmenata se računaju jednom vektorskom operacijom
+    segment_distances = segment_lengths(route_coords)
+    total_distance = segment_distances.sum()
 
     print("Segmenti rute:")
-    for i in range(len(route_coords) - 1):
-        start = route_coords[i]
-        end = route_coords[i + 1]
-        segment_distance = geodesic(start, end).meters
-        total_distance += segment_distance
+    for i, segment_distance in enumerate(segment_distances):
         print(f"  Segment {i + 1}: {segment_distance:.2f} m")
 
     print(f"Ukupna dužina rute: {total_distance / 1000:.2f} km")
 
 
+# Graf nije deo ključa, ali njegova veličina jeste (da se ne koristi ruta sa drugog grafa)
+@_disk_cache(key=lambda G, orig, dest: (len(G.nodes), len(G.edges), orig, dest))
 def get_route_coords(G, orig, dest):
     # Nađi najbliže čvorove u grafu
     orig_node = ox.distance.nearest_nodes(G, orig[1], orig[0])
     dest_node = ox.distance.nearest_nodes(G, dest[1], dest[0])
 
-    # Najkraća putanja između čvorova
-    route = nx.shortest_path(G, orig_node, dest_node, weight='length')
+    # Najkraća putanja između čvorova (osmnx bira najkraću od paralelnih ivica MultiDiGraph-a
+    # i koristi dvosmerni Dijkstra, koji pretražuje znatno manji deo grafa)
+    route = ox.shortest_path(G, orig_node, dest_node, weight='length')
+    if route is None:
+        raise ValueError(f"Nije pronađena ruta između čvorova {orig_node} i {dest_node}")
 
     route_coords = [(G.nodes[n]['y'], G.nodes[n]['x']) for n in route]
 
@@ -89,6 +130,9 @@ class DriveSimulator:
         self.fig, self.ax = ox.plot_graph(G, node_size=0, edge_color=edge_color, edge_linewidth=edge_linewidth,
                                           show=False, close=False)
         self.marker = None
+        # Statična pozadina (mapa + ruta) za blitting; osvežava se pri svakom punom iscrtavanju
+        self._bg = None
+        self.fig.canvas.mpl_connect('draw_event', self._sacuvaj_pozadinu)
 
     def prikazi_mapu(self, route_coords, route_color, auto_marker_color='ro', auto_marker_size=8):
         x = [lon for lat, lon in route_coords]
@@ -99,11 +143,24 @@ class DriveSimulator:
         self._set_map_bounds(route_coords, padding=0.2)
         self._show_background_map(self.ax)
 
-        self.marker, = self.ax.plot([], [], auto_marker_color, markersize=auto_marker_size, label='Automobil')
+        # Marker i naslov su "animirani": ne ulaze u pozadinu, već se crtaju preko nje blitting-om
+        self.marker, = self.ax.plot([], [], auto_marker_color, markersize=auto_marker_size, label='Automobil',
+                                    animated=True)
+        self.ax.title.set_animated(True)
         self.ax.legend()
 
         plt.ion()
         plt.show()
+        self.fig.canvas.draw()
+
+    def _sacuvaj_pozadinu(self, event):
+        self._bg = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._iscrtaj_animirane()
+
+    def _iscrtaj_animirane(self):
+        if self.marker is not None:
+            self.fig.draw_artist(self.marker)
+        self.fig.draw_artist(self.ax.title)
 
     def _show_background_map(self, ax):
         try:
@@ -132,16 +189,27 @@ class DriveSimulator:
     def move_auto_marker(self, lat, lon, auto_progress_info, plot_pause=0.01):
         self.marker.set_data([lon], [lat])
         title = (f"Pozicija: ({lat:.4f}, {lon:.4f}) | "
-                 f"Segment: {auto_progress_info['segment']}/{auto_progress_info['total_segments']} "
-                 f"({auto_progress_info['segment_progress']:.1f}%) | "
-                 f"Ukupno: {auto_progress_info['overall_progress']:.1f}% | "
-                 f"Brzina: {auto_progress_info['speed_kmh']} km/h")
+                 f"Segment: {auto_progress_info.segment}/{auto_progress_info.total_segments} "
+                 f"({auto_progress_info.segment_progress:.1f}%) | "
+                 f"Ukupno: {auto_progress_info.overall_progress:.1f}% | "
+                 f"Brzina: {auto_progress_info.speed_kmh} km/h")
         self.ax.set_title(title)
 
-        plt.draw()
-        plt.pause(plot_pause)
+        # Umesto plt.draw() (ponovno iscrtavanje mape, rute i osa) vraćamo sačuvanu
+        # pozadinu i iscrtavamo samo marker i naslov
+        canvas = self.fig.canvas
+        canvas.restore_region(self._bg)
+        self._iscrtaj_animirane()
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+        if plot_pause:
+            canvas.start_event_loop(plot_pause)
 
     def finish_drive(self):
+        # Završni prikaz je običan (ne-blit) prikaz, pa marker i naslov vraćamo u normalno iscrtavanje
+        if self.marker is not None:
+            self.marker.set_animated(False)
+        self.ax.title.set_animated(False)
         plt.ioff()
         plt.title("Ruta završena!")
         plt.show()
\ No newline at end of file
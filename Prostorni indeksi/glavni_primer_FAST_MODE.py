@@ -6,6 +6,7 @@ from drive_simulator import DriveSimulator, get_route_coordinates, get_route_coo
 
 # --- DODATI IMPORTI ZA SISTEM UPOZORENJA ---
 import math
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point, box
@@ -86,9 +87,18 @@ class AccidentWarningSystem:
 
         print(f"Izgradnja '{tip_indeksa}' indeksa...")
         if tip_indeksa == 'rtree':
-            idx = index.Index()
-            for red in self.gdf_nezgode.itertuples():
-                idx.insert(red.Index, red.geometry.bounds)
+            # Tačke su pravougaonici nulte površine: (min_lon, min_lat, max_lon, max_lat)
+            lon = self.gdf_nezgode['lon'].to_numpy(dtype=np.float64)
+            lat = self.gdf_nezgode['lat'].to_numpy(dtype=np.float64)
+            koordinate = np.c_[lon, lat, lon, lat]
+
+            # Stream-loading: ceo indeks se pakuje u jednom prolazu na C strani,
+            # umesto jednog insert() poziva po nezgodi. ID je pozicija reda (za .iloc).
+            def stream():
+                for i in range(len(koordinate)):
+                    yield i, tuple(koordinate[i]), None
+
+            idx = index.Index(stream(), properties=index.Property(leaf_capacity=100))
             print("R-tree indeks uspešno izgrađen.")
             return idx
         else:
@@ -121,15 +131,16 @@ class AccidentWarningSystem:
         if broj_ukupno == 0:
             return 0, 0, 0
 
+        # Brojimo direktno nad NumPy nizovima (count_nonzero), bez pravljenja pod-DataFrame-a
         sat = trenutno_vreme.hour
         donja_granica_sati, gornja_granica_sati = (sat - VREMENSKI_OPSEG_SATI), (sat + VREMENSKI_OPSEG_SATI)
-        broj_doba_dana = len(
-            nezgode_u_oblasti[nezgode_u_oblasti['sat'].between(donja_granica_sati, gornja_granica_sati)])
+        sati = nezgode_u_oblasti['sat'].to_numpy()
+        broj_doba_dana = int(np.count_nonzero((sati >= donja_granica_sati) & (sati <= gornja_granica_sati)))
 
         dan = trenutno_vreme.dayofyear
         donja_granica_dana, gornja_granica_dana = (dan - VREMENSKI_OPSEG_DANA), (dan + VREMENSKI_OPSEG_DANA)
-        broj_doba_godine = len(
-            nezgode_u_oblasti[nezgode_u_oblasti['dan_u_godini'].between(donja_granica_dana, gornja_granica_dana)])
+        dani = nezgode_u_oblasti['dan_u_godini'].to_numpy()
+        broj_doba_godine = int(np.count_nonzero((dani >= donja_granica_dana) & (dani <= gornja_granica_dana)))
 
         return broj_ukupno, broj_doba_dana, broj_doba_godine
 
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
-import time
 from auto_simulator import AutoSimulator
 from drive_simulator import DriveSimulator, get_route_coordinates, get_route_coords, load_serbian_roads, \
     show_route_distances
 
 # --- IZMENJENI IMPORTI ZA SISTEM UPOZORENJA ---
 import math
+import os
+import pickle
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+from numba import njit
 import pandas as pd
-import geopandas as gpd
 from shapely.geometry import Point, box
 # Uklonjen je 'rtree', dodat je 'pygeohash'
 import pygeohash
@@ -25,6 +29,106 @@ VREMENSKI_OPSEG_SATI = 1
 VREMENSKI_OPSEG_DANA = 30
 GODINA_ZA_ANALIZU = 2021
 GEOHASH_PRECISION = 7  # Dobar balans: ćelije su ~153x153 metra
+VELICINA_KESA_UPITA = 4096  # Broj zapamćenih rezultata (ćelija, sat, dan)
+MIKROSTEPENI = 1e6  # Koordinate se u indeksu čuvaju kao int32 mikrostepeni (±180e6 staje u int32)
+
+# Base32 alfabet GeoHash-a kao niz bajtova (osnova za obrnutu lookup tabelu)
+_GEOHASH_BASE32 = np.frombuffer(b'0123456789bcdefghjkmnpqrstuvwxyz', dtype=np.uint8)
+# Obrnuta tabela: ASCII kod karaktera -> vrednost 0-31 (za dekodiranje prefiksa)
+_GEOHASH_BASE32_VREDNOSTI = np.zeros(256, dtype=np.uint64)
+_GEOHASH_BASE32_VREDNOSTI[_GEOHASH_BASE32] = np.arange(32, dtype=np.uint64)
+
+
+def _geohash_kodovi(lat, lon, preciznost):
+    """
+    Vektorski računa GeoHash kao ceo broj (5 bita po karakteru) za nizove lat/lon.
+    Bitovi se dobijaju istim polovljenjem intervala kao u pygeohash.encode.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    kodovi = np.zeros(lat.shape, dtype=np.uint64)
+    lat_min, lat_max = np.full(lat.shape, -90.0), np.full(lat.shape, 90.0)
+    lon_min, lon_max = np.full(lon.shape, -180.0), np.full(lon.shape, 180.0)
+    for i in range(5 * preciznost):
+        # Parni bitovi kodiraju longitudu, neparni latitudu
+        if i % 2 == 0:
+            vrednost, donja, gornja = lon, lon_min, lon_max
+        else:
+            vrednost, donja, gornja = lat, lat_min, lat_max
+        sredina = (donja + gornja) / 2
+        bit = vrednost >= sredina
+        np.copyto(donja, sredina, where=bit)
+        np.copyto(gornja, sredina, where=~bit)
+        kodovi = (kodovi << np.uint64(1)) | bit.astype(np.uint64)
+    return kodovi
+
+
+@lru_cache(maxsize=1024)
+def _ofset_oblasti(lat_zaokruzeno):
+    """
+    Vraća (offset_lat, offset_lon) u stepenima za POGLED_UNAPRED_KM. Latituda je zaokružena
+    na 3 decimale (~110 m), pa se kosinus računa samo jednom za svaku takvu traku.
+    """
+    lat_stepen_u_km = 111.1
+    lon_stepen_u_km = lat_stepen_u_km * math.cos(math.radians(lat_zaokruzeno))
+    return POGLED_UNAPRED_KM / lat_stepen_u_km, POGLED_UNAPRED_KM / lon_stepen_u_km
+
+
+def _u_mikrostepene(stepeni):
+    """
+    Kvantizuje koordinatu (skalar ili niz) u int32 mikrostepene (korak ~11 cm).
+    """
+    return np.round(np.asarray(stepeni, dtype=np.float64) * MIKROSTEPENI).astype(np.int32)
+
+
+@njit(cache=True)
+def _skeniraj_opsege(pocetci, krajevi, lon, lat, sat, doy, min_lon, min_lat, max_lon, max_lat,
+                     q_sat, opseg_sati, q_dan, opseg_dana):
+    """
+    Jedan prolaz kroz opsege kandidata [pocetci[k], krajevi[k]) koji spaja bbox test i oba
+    vremenska brojanja, bez međunizova. Koordinate i bbox su int32 mikrostepeni, pa su
+    poređenja celobrojna i dobro se vektorizuju. Vremenski prozori su kružni (23h i 0h su
+    susedni sati, 31. decembar i 1. januar susedni dani). Vraća (ukupno, doba_dana, doba_godine).
+    """
+    ukupno = doba_dana = doba_godine = 0
+    for k in range(pocetci.size):
+        for i in range(pocetci[k], krajevi[k]):
+            if min_lon <= lon[i] <= max_lon and min_lat <= lat[i] <= max_lat:
+                ukupno += 1
+                d_sat = (sat[i] - q_sat) % 24
+                if min(d_sat, 24 - d_sat) <= opseg_sati:
+                    doba_dana += 1
+                d_dan = (doy[i] - q_dan) % 365
+                if min(d_dan, 365 - d_dan) <= opseg_dana:
+                    doba_godine += 1
+    return ukupno, doba_dana, doba_godine
+
+
+def _geohash_iz_teksta(geohashes):
+    """
+    Pretvara listu GeoHash stringova iste dužine u celobrojne kodove. Vraća (kodovi, dužina).
+    """
+    duzina = len(geohashes[0])
+    bajtovi = np.array(geohashes, dtype=f'S{duzina}').view(np.uint8).reshape(-1, duzina)
+    kodovi = np.zeros(len(geohashes), dtype=np.uint64)
+    for k in range(duzina):
+        kodovi = (kodovi << np.uint64(5)) | _GEOHASH_BASE32_VREDNOSTI[bajtovi[:, k]]
+    return kodovi, duzina
+
+
+@dataclass
+class NezgodeNizovi:
+    """
+    Kolonski (SoA) prikaz nezgoda, sortiranih po GeoHash kodu, koji koristi vruća putanja upita.
+    """
+    lon_mikro: np.ndarray
+    lat_mikro: np.ndarray
+    sat: np.ndarray
+    doy: np.ndarray
+    gh_int: np.ndarray
+
+    def __len__(self):
+        return len(self.gh_int)
 
 
 class AccidentWarningSystem:
@@ -38,10 +142,14 @@ class AccidentWarningSystem:
         Inicijalizuje sistem, učitava podatke i priprema ih za GeoHash upite.
         """
         print("Inicijalizacija sistema za upozorenje sa GeoHash-om...")
-        self.gdf_nezgode = self._ucitaj_i_pripremi_podatke(putanja_do_fajla)
-        self.indeks = self._izgradi_indeks(tip_indeksa)
+        # Tabela služi samo za pripremu; upiti rade nad nizovima iz self.indeks,
+        # pa je ne čuvamo posle izgradnje indeksa
+        df_nezgode = self._ucitaj_i_pripremi_podatke(putanja_do_fajla)
+        self.indeks = self._izgradi_indeks(df_nezgode, tip_indeksa)
         if self.indeks is None:
             raise Exception("Podaci za GeoHash nisu uspešno pripremljeni. Prekidam rad.")
+        # Keš rezultata po GeoHash ćeliji i vremenskom "bucket-u" (sat, dan u godini)
+        self._proveri_celiju = lru_cache(maxsize=VELICINA_KESA_UPITA)(self._izracunaj_opasnosti_za_celiju)
         print("Sistem je spreman.")
 
     def _ucitaj_i_pripremi_podatke(self, putanja_do_fajla):
@@ -50,43 +158,76 @@ class AccidentWarningSystem:
         """
         print(f"Učitavanje i obrada podataka iz: {putanja_do_fajla}")
         try:
-            df = pd.read_excel(putanja_do_fajla, header=None)
-            df.rename(columns={3: 'datum', 4: 'lon', 5: 'lat'}, inplace=True)
+            df = self._ucitaj_kolone(putanja_do_fajla)
         except FileNotFoundError:
             print(f"GREŠKA: Fajl nije pronađen na putanji: {putanja_do_fajla}")
             return None
 
-        df['vreme_nezgode'] = pd.to_datetime(df['datum'], errors='coerce', format='%d.%m.%Y,%H:%M')
+        # Jeftin predfilter na sirovom stringu ("DD.MM.YYYY,HH:MM"), da se parsiraju samo redovi tražene godine
+        df = df[df['datum'].str.contains(f'.{GODINA_ZA_ANALIZU},', regex=False, na=False)].copy()
+
+        # Eksplicitni format + cache=True: svaki jedinstveni string se parsira samo jednom
+        df['vreme_nezgode'] = pd.to_datetime(df['datum'], errors='coerce', format='%d.%m.%Y,%H:%M', cache=True)
         df = df.dropna(subset=['vreme_nezgode', 'lon', 'lat'])
         df = df[df['vreme_nezgode'].dt.year == GODINA_ZA_ANALIZU].copy()
 
         df['sat'] = df['vreme_nezgode'].dt.hour
         df['dan_u_godini'] = df['vreme_nezgode'].dt.dayofyear
 
-        geometry = [Point(xy) for xy in zip(df['lon'], df['lat'])]
-        gdf = gpd.GeoDataFrame(df, geometry=geometry, crs='EPSG:4326')
-
+        # Sortiramo nezgode po celobrojnom GeoHash kodu, tako da svaki prefiks postaje
+        # neprekidan opseg indeksa koji se nalazi binarnom pretragom
         print(f"Izračunavanje GeoHash-eva sa preciznošću {GEOHASH_PRECISION}...")
-        gdf['geohash'] = gdf.apply(
-            lambda row: pygeohash.encode(row.geometry.y, row.geometry.x, precision=GEOHASH_PRECISION),
-            axis=1
-        )
+        kodovi = _geohash_kodovi(df['lat'].to_numpy(np.float64), df['lon'].to_numpy(np.float64),
+                                 GEOHASH_PRECISION)
+        redosled = np.argsort(kodovi, kind='stable')
+        df = df.iloc[redosled].assign(geohash_kod=kodovi[redosled])
 
-        print(f"Obrada završena. Učitano {len(gdf)} nezgoda za {GODINA_ZA_ANALIZU}. godinu.")
-        return gdf
+        # Upiti rade samo nad nizovima iz sortirane tabele, pa Shapely geometrije i GeoHash
+        # stringovi nisu potrebni
+        print(f"Obrada završena. Učitano {len(df)} nezgoda za {GODINA_ZA_ANALIZU}. godinu.")
+        return df
 
-    def _izgradi_indeks(self, tip_indeksa):
+    @staticmethod
+    def _ucitaj_kolone(putanja_do_fajla):
+        """
+        Čita iz Excel fajla samo kolone D, E, F (datum, lon, lat). Pročitana tabela se
+        kešira pored izvornog fajla; ključ keša su vreme izmene i veličina izvornog fajla
+        (kao u zadatak1), pa izmenjen ili prekopiran fajl dobija nov keš.
         """
-        Za GeoHash, "Indeks" je sama GeoDataFrame tabela sa 'geohash' kolonom.
+        kljuc = f"{os.path.getmtime(putanja_do_fajla):.0f}_{os.path.getsize(putanja_do_fajla)}"
+        putanja_kesa = f"{putanja_do_fajla}.{kljuc}.cache.pkl"
+        if os.path.exists(putanja_kesa):
+            try:
+                return pd.read_pickle(putanja_kesa)
+            except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+                print(f"Keš {putanja_kesa} je oštećen, Excel fajl se čita ponovo.")
+
+        df = pd.read_excel(putanja_do_fajla, header=None, usecols=[3, 4, 5], names=['datum', 'lon', 'lat'])
+        # Pišemo pod privremenim imenom pa preimenujemo, da prekinut upis ne ostavi nedovršen keš
+        privremena = f"{putanja_kesa}.{os.getpid()}.tmp"
+        df.to_pickle(privremena)
+        os.replace(privremena, putanja_kesa)
+        return df
+
+    def _izgradi_indeks(self, df_nezgode, tip_indeksa):
         """
-        if self.gdf_nezgode is None:
+        Za GeoHash, "Indeks" su kolone tabele sortirane po celobrojnom GeoHash kodu,
+        izdvojene u kontinualne NumPy nizove (NezgodeNizovi).
+        """
+        if df_nezgode is None:
             return None
         if tip_indeksa == 'geohash':
-            if 'geohash' in self.gdf_nezgode.columns:
+            if 'geohash_kod' in df_nezgode.columns:
                 print("GeoHash podaci su uspešno pripremljeni.")
-                return self.gdf_nezgode
+                return NezgodeNizovi(
+                    lon_mikro=_u_mikrostepene(df_nezgode['lon'].to_numpy()),
+                    lat_mikro=_u_mikrostepene(df_nezgode['lat'].to_numpy()),
+                    sat=df_nezgode['sat'].to_numpy(np.int16),
+                    doy=df_nezgode['dan_u_godini'].to_numpy(np.int16),
+                    gh_int=df_nezgode['geohash_kod'].to_numpy(np.uint64),
+                )
             else:
-                print("GREŠKA: Kolona 'geohash' nije pronađena.")
+                print("GREŠKA: Kolona 'geohash_kod' nije pronađena.")
                 return None
         else:
             print(f"GREŠKA: Ovaj sistem je konfigurisan samo za 'geohash', a ne za '{tip_indeksa}'")
@@ -96,18 +237,25 @@ class AccidentWarningSystem:
         """
         Definiše pravougaonu oblast (bounding box) ispred i oko vozila.
         """
-        lat_stepen_u_km = 111.1
-        lon_stepen_u_km = lat_stepen_u_km * math.cos(math.radians(trenutna_tacka.y))
-        offset_lat = POGLED_UNAPRED_KM / lat_stepen_u_km
-        offset_lon = POGLED_UNAPRED_KM / lon_stepen_u_km
+        offset_lat, offset_lon = _ofset_oblasti(round(trenutna_tacka.y, 3))
         lon, lat = trenutna_tacka.x, trenutna_tacka.y
         return box(lon - offset_lon, lat - offset_lat, lon + offset_lon, lat + offset_lat)
 
     def proveri_opasnosti_na_deonici(self, trenutna_lokacija, trenutno_vreme):
         """
         Glavna javna metoda koja vrši sve provere koristeći GeoHash.
+        Vozilo se često zadržava u istoj ćeliji tokom više provera, pa se rezultati pamte
+        po ključu (GeoHash ćelija, sat, dan u godini).
         """
-        oblast_pretrage = self._definisi_oblast_pretrage(trenutna_lokacija)
+        celija = pygeohash.encode(trenutna_lokacija.y, trenutna_lokacija.x, precision=GEOHASH_PRECISION)
+        return self._proveri_celiju(celija, trenutno_vreme.hour, trenutno_vreme.dayofyear)
+
+    def _izracunaj_opasnosti_za_celiju(self, celija, sat, dan):
+        """
+        Vrši stvarnu proveru za centar GeoHash ćelije, tako da rezultat zavisi samo od ključa keša.
+        """
+        centar = pygeohash.decode(celija)
+        oblast_pretrage = self._definisi_oblast_pretrage(Point(centar.longitude, centar.latitude))
 
         # --- FINALNA ISPRAVKA ---
         bbox = oblast_pretrage.bounds  # tuple: (min_lon, min_lat, max_lon, max_lat)
@@ -117,31 +265,27 @@ class AccidentWarningSystem:
         # north = max_lat = bbox[3]
         # east = max_lon = bbox[2]
         bounding_box_obj = pygeohash.BoundingBox(bbox[1], bbox[0], bbox[3], bbox[2])
-        geohashes_to_check = pygeohash.geohashes_in_box(bounding_box_obj)
+        # Prefiksi ne smeju biti duži od GEOHASH_PRECISION (pomeraj ispod bi bio negativan);
+        # 6 je podrazumevana preciznost geohashes_in_box
+        geohashes_to_check = pygeohash.geohashes_in_box(bounding_box_obj, precision=min(6, GEOHASH_PRECISION))
         # ---------------------------
 
         if not geohashes_to_check:
             return 0, 0, 0
 
-        ids_kandidata = self.indeks[self.indeks['geohash'].str.startswith(tuple(geohashes_to_check))]
-
-        if ids_kandidata.empty:
-            return 0, 0, 0
-
-        nezgode_u_oblasti = ids_kandidata[ids_kandidata.intersects(oblast_pretrage)]
-        broj_ukupno = len(nezgode_u_oblasti)
-        if broj_ukupno == 0:
-            return 0, 0, 0
-
-        sat = trenutno_vreme.hour
-        donja_granica_sati, gornja_granica_sati = (sat - VREMENSKI_OPSEG_SATI), (sat + VREMENSKI_OPSEG_SATI)
-        broj_doba_dana = len(
-            nezgode_u_oblasti[nezgode_u_oblasti['sat'].between(donja_granica_sati, gornja_granica_sati)])
+        # Svaki prefiks dužine L pokriva opseg kodova [p << 5*(P-L), (p+1) << 5*(P-L)),
+        # gde je P = GEOHASH_PRECISION
+        prefiksi, duzina = _geohash_iz_teksta(geohashes_to_check)
+        pomeraj = np.uint64(5 * (GEOHASH_PRECISION - duzina))
+        pocetci = np.searchsorted(self.indeks.gh_int, prefiksi << pomeraj)
+        krajevi = np.searchsorted(self.indeks.gh_int, (prefiksi + np.uint64(1)) << pomeraj)
 
-        dan = trenutno_vreme.dayofyear
-        donja_granica_dana, gornja_granica_dana = (dan - VREMENSKI_OPSEG_DANA), (dan + VREMENSKI_OPSEG_DANA)
-        broj_doba_godine = len(
-            nezgode_u_oblasti[nezgode_u_oblasti['dan_u_godini'].between(donja_granica_dana, gornja_granica_dana)])
+        # Fina provera (nezgode su tačke, a oblast pravougaonik poravnat sa osama, pa su dovoljna
+        # četiri poređenja) i oba vremenska filtera u jednom JIT-kompajliranom prolazu
+        min_lon, min_lat, max_lon, max_lat = _u_mikrostepene(bbox)
+        broj_ukupno, broj_doba_dana, broj_doba_godine = _skeniraj_opsege(
+            pocetci, krajevi, self.indeks.lon_mikro, self.indeks.lat_mikro, self.indeks.sat, self.indeks.doy,
+            min_lon, min_lat, max_lon, max_lat, sat, VREMENSKI_OPSEG_SATI, dan, VREMENSKI_OPSEG_DANA)
 
         return broj_ukupno, broj_doba_dana, broj_doba_godine
 
@@ -204,13 +348,16 @@ if __name__ == "__main__":
     print("Za zaustavljanje pritisnite Ctrl+C\n")
 
     interval_simulacije = 1.0
+    redraw_every = 5  # Mapa (marker i naslov) se osvežava na svakih N koraka simulacije
     try:
         step_count = 0
         while automobil.running:
             auto_current_pos = automobil.move()
             lat, lon = auto_current_pos
-            drive_simulator.move_auto_marker(lat, lon, automobil.get_progress_info(), plot_pause=0.01)
             step_count += 1
+            # Naslov se formatira i marker iscrtava samo kada se prikaz zaista osvežava
+            if step_count % redraw_every == 0 or not automobil.running:
+                drive_simulator.move_auto_marker(lat, lon, automobil.get_progress_info(), plot_pause=0)
             if step_count % 5 == 0:
                 if sistem_upozorenja:
                     trenutna_lokacija_point = Point(lon, lat)
@@ -224,7 +371,9 @@ if __name__ == "__main__":
             if automobil.is_finished():
                 print("\n=== Automobil je stigao na destinaciju! ===")
                 break
-            time.sleep(interval_simulacije)
+            # Jedno čekanje po koraku, tokom kog GUI petlja obrađuje događaje (umesto
+            # blokirajućeg time.sleep + dodatnog plt.pause)
+            drive_simulator.fig.canvas.start_event_loop(interval_simulacije)
     except KeyboardInterrupt:
         print("\n\n=== Simulacija prekinuta ===")
     drive_simulator.finish_drive()
\ No newline at end of file
@@ -9,11 +9,17 @@ Ključne karakteristike:
 - Modularan dizajn za laku promenu tipa indeksa.
 - Čista i jasna struktura za lakše razumevanje.
 """
-import math
+import os
+import zipfile
+from functools import lru_cache
 
+import numpy as np
+from numba import njit, prange
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point, box
+import shapely
+from pyproj import Transformer
+from shapely.geometry import Point
 from rtree import index
 import time
 
@@ -22,6 +28,52 @@ POGLED_UNAPRED_KM = 2.0  # Koliko kilometara unapred gledamo
 VREMENSKI_OPSEG_SATI = 1  # +/- 1 sat za doba dana
 VREMENSKI_OPSEG_DANA = 30  # +/- 30 dana za doba godine
 GODINA_ZA_ANALIZU = 2021  # Prema zadatku, dovoljno je uzeti jednu godinu
+LOKALNI_CRS = 'EPSG:32634'  # UTM zona 34N pokriva Srbiju, koordinate su u metrima
+KORAK_MREZE_M = 100.0  # Centar oblasti pretrage se zaokružuje na mrežu od 100 m
+VELICINA_KESA_UPITA = 4096  # Broj zapamćenih skupova kandidata (ćelija mreže)
+KES_DIREKTORIJUM = '.nezgode_cache'  # Pripremljeni nizovi i R-tree fajlovi, pored izvornog fajla
+
+# Pola stranice kvadrata pretrage u metrima; u metričkom CRS-u je isto na svakoj latitudi
+_POLA_STRANICE_M = POGLED_UNAPRED_KM * 1000.0
+
+# Transformer se pravi jednom; always_xy=True znači redosled (lon, lat) -> (x, y)
+_U_LOKALNI_CRS = Transformer.from_crs('EPSG:4326', LOKALNI_CRS, always_xy=True).transform
+
+
+@njit(cache=True, boundscheck=False)
+def _prebroj_prozore(ids, sat_arr, doy_arr, q_sat, opseg_sati, q_dan, opseg_dana):
+    """
+    Jedan prolaz kroz pozicije kandidata koji broji oba vremenska prozora odjednom,
+    bez međunizova (maski). Prozori su kružni: 23h i 0h su susedni sati, a 31. decembar
+    i 1. januar susedni dani. Vraća (ukupno, doba_dana, doba_godine).
+    """
+    doba_dana = doba_godine = 0
+    for k in range(ids.size):
+        i = ids[k]
+        # Kružna razlika svedena na [-12, 12) sati, odnosno [-182, 183) dana
+        d_sat = (sat_arr[i] - q_sat + 12) % 24 - 12
+        d_dan = (doy_arr[i] - q_dan + 182) % 365 - 182
+        doba_dana += abs(d_sat) <= opseg_sati
+        doba_godine += abs(d_dan) <= opseg_dana
+    return ids.size, doba_dana, doba_godine
+
+
+@njit(cache=True, parallel=True)
+def _prebroj_prozore_po_tackama(ids, granice, sat_arr, doy_arr, q_sati, opseg_sati, q_dani, opseg_dana):
+    """
+    Paralelno (prange, po jedna nit po tački rute) broji prozore za grupe kandidata
+    ids[granice[j]:granice[j + 1]]. Vraća matricu sa redom (ukupno, doba_dana, doba_godine)
+    za svaku tačku.
+    """
+    n = granice.size - 1
+    rezultat = np.zeros((n, 3), dtype=np.int64)
+    for j in prange(n):
+        ukupno, doba_dana, doba_godine = _prebroj_prozore(
+            ids[granice[j]:granice[j + 1]], sat_arr, doy_arr, q_sati[j], opseg_sati, q_dani[j], opseg_dana)
+        rezultat[j, 0] = ukupno
+        rezultat[j, 1] = doba_dana
+        rezultat[j, 2] = doba_godine
+    return rezultat
 
 
 class AccidentWarningSystem:
@@ -35,79 +87,162 @@ class AccidentWarningSystem:
         Inicijalizuje sistem, učitava podatke i gradi odgovarajući indeks.
         """
         print("Inicijalizacija sistema za upozorenje...")
-        self.gdf_nezgode = self._ucitaj_i_pripremi_podatke(putanja_do_fajla)
-        self.indeks = self._izgradi_indeks(tip_indeksa)
+        putanja_kesa = self._putanja_kesa(putanja_do_fajla)
+        nizovi = self._ucitaj_nizove(putanja_do_fajla, putanja_kesa)
+        if nizovi is None:
+            raise Exception("Indeks nije uspešno izgrađen. Prekidam rad.")
+
+        # GeoDataFrame se ne čuva: upitima trebaju samo kontinualni NumPy nizovi (indeksirani
+        # pozicijom, kao i ID-jevi u indeksu), 19 B po nezgodi (2 x float64 + int8 + int16)
+        # umesto Shapely tačke i pandas blokova. Koordinate su projektovane (metri u LOKALNI_CRS)
+        self._x_arr, self._y_arr, self._sat_arr, self._doy_arr = nizovi
+        self.indeks = self._izgradi_indeks(tip_indeksa, putanja_kesa + '_rtree')
         if self.indeks is None:
             raise Exception("Indeks nije uspešno izgrađen. Prekidam rad.")
+
+        # Keš kandidata po ćeliji mreže: uzastopne tačke sporog vozila padaju u istu ćeliju
+        self._kandidati = lru_cache(maxsize=VELICINA_KESA_UPITA)(self._pronadji_kandidate)
         print("Sistem je spreman.")
 
+    @staticmethod
+    def _putanja_kesa(putanja_do_fajla):
+        """
+        Vraća osnovu imena keš fajlova za izvorni fajl. Ključ su vreme izmene i veličina fajla,
+        kao i godina i CRS od kojih zavise nizovi i indeks, pa svaka promena dobija nov keš.
+        Vraća None ako fajl ne postoji.
+        """
+        if not os.path.exists(putanja_do_fajla):
+            return None
+        kljuc = (f"{os.path.getmtime(putanja_do_fajla):.0f}_{os.path.getsize(putanja_do_fajla)}"
+                 f"_{GODINA_ZA_ANALIZU}_{LOKALNI_CRS.replace(':', '')}")
+        direktorijum = os.path.join(os.path.dirname(os.path.abspath(putanja_do_fajla)), KES_DIREKTORIJUM)
+        return os.path.join(direktorijum, f"{os.path.basename(putanja_do_fajla)}_{kljuc}")
+
+    def _ucitaj_nizove(self, putanja_do_fajla, putanja_kesa):
+        """
+        Vraća nizove (x, y, sat, dan_u_godini) iz keša, a ako keša nema, obrađuje izvorni
+        fajl i čuva rezultat u keš (np.savez), da sledeće pokretanje preskoči Excel.
+        Oštećen keš se tretira kao da ga nema, pa se podaci obrađuju i keš ponovo zapisuje.
+        """
+        if putanja_kesa is not None and os.path.exists(putanja_kesa + '.npz'):
+            try:
+                with np.load(putanja_kesa + '.npz') as kes:
+                    nizovi = kes['x'], kes['y'], kes['sat'], kes['doy']
+                print(f"Učitano {len(nizovi[0])} nezgoda iz keša: {putanja_kesa}.npz")
+                return nizovi
+            except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+                print(f"Keš {putanja_kesa}.npz je oštećen, podaci se obrađuju ponovo.")
+
+        gdf_nezgode = self._ucitaj_i_pripremi_podatke(putanja_do_fajla)
+        if gdf_nezgode is None:
+            return None
+
+        nizovi = (gdf_nezgode.geometry.x.to_numpy(), gdf_nezgode.geometry.y.to_numpy(),
+                  gdf_nezgode['sat'].to_numpy(), gdf_nezgode['dan_u_godini'].to_numpy())
+        # Kao i R-tree: pišemo pod privremenim imenom pa preimenujemo, da prekinut upis
+        # nikad ne ostavi nedovršen keš pod konačnim imenom
+        os.makedirs(os.path.dirname(putanja_kesa), exist_ok=True)
+        privremena = f"{putanja_kesa}.{os.getpid()}.tmp.npz"
+        np.savez(privremena, x=nizovi[0], y=nizovi[1], sat=nizovi[2], doy=nizovi[3])
+        os.replace(privremena, putanja_kesa + '.npz')
+        return nizovi
+
     def _ucitaj_i_pripremi_podatke(self, putanja_do_fajla):
         """
         Privatna metoda za učitavanje i temeljna pripremu podataka.
         """
         print(f"Učitavanje i obrada podataka iz: {putanja_do_fajla}")
         try:
-            # KORAK 1: Učitavamo fajl i kažemo mu da NEMA ZAGLAVLJE (header=None)
-            df = pd.read_excel(putanja_do_fajla, header=None)
-
-            # KORAK 2: Dodeljujemo imena kolonama koje nas interesuju
-            # Kolone se broje od 0. Na osnovu slike:
+            # Fajl NEMA ZAGLAVLJE (header=None), a čitamo samo kolone koje nas interesuju
+            # i odmah im dodeljujemo imena. Kolone se broje od 0. Na osnovu slike:
             # Kolona D je 3. kolona (datum)
             # Kolona E je 4. kolona (longituda)
             # Kolona F je 5. kolona (latituda)
-            df.rename(columns={
-                3: 'datum',
-                4: 'lon',
-                5: 'lat'
-            }, inplace=True)
+            df = pd.read_excel(putanja_do_fajla, header=None, usecols=[3, 4, 5], names=['datum', 'lon', 'lat'])
 
         except FileNotFoundError:
             print(f"GREŠKA: Fajl nije pronađen na putanji: {putanja_do_fajla}")
             return None
 
-        # Odavde kod ostaje isti, jer smo uspešno preimenovali kolone
+        # Jeftino filtriranje godine na sirovom stringu "DD.MM.YYYY,HH:MM" (znakovi 6-9),
+        # pre skupljeg parsiranja datuma, tako da se parsiraju samo redovi tražene godine
+        godine = df['datum'].str[6:10]
+        df = df[godine == str(GODINA_ZA_ANALIZU)].copy()
+
         # Konverzija u datetime i filtriranje samo jedne godine
-        # Dodajemo i format da pomognemo pandasu da razume "DD.MM.YYYY,HH:MM"
-        df['vreme_nezgode'] = pd.to_datetime(df['datum'], errors='coerce', format='%d.%m.%Y,%H:%M')
+        # Dodajemo i format da pomognemo pandasu da razume "DD.MM.YYYY,HH:MM",
+        # a cache=True parsira svaki jedinstveni string samo jednom
+        df['vreme_nezgode'] = pd.to_datetime(df['datum'], errors='coerce', format='%d.%m.%Y,%H:%M', cache=True)
         df = df.dropna(subset=['vreme_nezgode', 'lon', 'lat'])
         df = df[df['vreme_nezgode'].dt.year == GODINA_ZA_ANALIZU].copy()
 
         # OPTIMIZACIJA: Unapred izračunavamo vremenske komponente
-        df['sat'] = df['vreme_nezgode'].dt.hour
-        df['dan_u_godini'] = df['vreme_nezgode'].dt.dayofyear
-
-        # Kreiranje GeoDataFrame-a
-        geometry = [Point(xy) for xy in zip(df['lon'], df['lat'])]
+        # u najužim tipovima koji ih drže (0-23 u int8, 1-366 u int16) umesto int64
+        df['sat'] = df['vreme_nezgode'].dt.hour.astype(np.int8)
+        df['dan_u_godini'] = df['vreme_nezgode'].dt.dayofyear.astype(np.int16)
+
+        # Kreiranje GeoDataFrame-a (sve tačke se prave jednim vektorskim pozivom)
+        lon = df['lon'].to_numpy(dtype='float64')
+        lat = df['lat'].to_numpy(dtype='float64')
+        geometry = shapely.points(lon, lat)
         gdf = gpd.GeoDataFrame(df, geometry=geometry, crs='EPSG:4326')
 
+        # Jednom projektujemo u lokalni metrički CRS, pa je oblast pretrage uvek isti kvadrat
+        gdf = gdf.to_crs(LOKALNI_CRS)
+
         print(f"Obrada završena. Učitano {len(gdf)} nezgoda za {GODINA_ZA_ANALIZU}. godinu.")
         return gdf
 
-    def _izgradi_indeks(self, tip_indeksa):
+    def _izgradi_indeks(self, tip_indeksa, putanja_rtree):
         """
-        Gradi prostorni indeks na osnovu izabranog tipa.
+        Gradi prostorni indeks na osnovu izabranog tipa nad nizovima _x_arr i _y_arr.
+        R-tree se čuva na disku (putanja_rtree.idx/.dat) i pri sledećem pokretanju samo otvara.
         """
-        if self.gdf_nezgode is None:
-            return None
-
-        print(f"Izgradnja '{tip_indeksa}' indeksa...")
-
         # Modularni pristup za različite indekse
         if tip_indeksa == 'rtree':
-            idx = index.Index()
-            # .itertuples() je brži od .iterrows()
-            for red in self.gdf_nezgode.itertuples():
-                idx.insert(red.Index, red.geometry.bounds)
+            if os.path.exists(putanja_rtree + '.idx') and os.path.exists(putanja_rtree + '.dat'):
+                print(f"Otvaranje R-tree indeksa iz keša: {putanja_rtree}")
+                idx = index.Index(putanja_rtree)
+                # Keširano stablo mora da sadrži tačno sve nezgode iz nizova, inače se gradi ponovo
+                if idx.get_size() == len(self._x_arr):
+                    return idx
+                print("Keširani R-tree ne odgovara podacima, gradi se ponovo.")
+                idx.close()
+
+            print(f"Izgradnja '{tip_indeksa}' indeksa...")
+            # Tačke su pravougaonici nulte površine: (min_x, min_y, max_x, max_y) u LOKALNI_CRS
+            xs, ys = self._x_arr, self._y_arr
+
+            # Stream-loading: indeks se pakuje odjednom na C strani (bolje balansirano stablo),
+            # umesto jednog insert() poziva po redu. ID je pozicija u nizovima _x_arr, _sat_arr...
+            def stream():
+                for i, (x, y) in enumerate(zip(xs, ys)):
+                    yield i, (x, y, x, y), None
+
+            # Gradimo pod privremenim imenom i zatvaramo (upis na disk je tada završen), pa tek
+            # onda preimenujemo, da drugi proces ili instanca nikad ne otvori nedovršeno stablo
+            privremena = f"{putanja_rtree}.{os.getpid()}_{id(self)}.tmp"
+            index.Index(privremena, stream()).close()
+            for ekstenzija in ('.dat', '.idx'):
+                os.replace(privremena + ekstenzija, putanja_rtree + ekstenzija)
             print("R-tree indeks uspešno izgrađen.")
+            return index.Index(putanja_rtree)
+
+        print(f"Izgradnja '{tip_indeksa}' indeksa...")
+        if tip_indeksa == 'strtree':
+            # Shapely STRtree se pakuje u C-u iz niza geometrija u jednom pozivu i podržava
+            # grupne upite (više oblasti odjednom), što koristi proveri_opasnosti_na_ruti
+            idx = shapely.STRtree(shapely.points(self._x_arr, self._y_arr))
+            print("STRtree indeks uspešno izgrađen.")
             return idx
 
         elif tip_indeksa == 'geohash':
             # Ovde bi išla implementacija za GeoHash. Primer:
             # import pygeohash
-            # self.gdf_nezgode['geohash'] = self.gdf_nezgode.apply(
+            # gdf_nezgode['geohash'] = gdf_nezgode.apply(
             #     lambda r: pygeohash.encode(r.geometry.y, r.geometry.x, precision=7), axis=1
             # )
-            # return self.gdf_nezgode.set_index('geohash') # Vraća GeoDataFrame sa indeksom
+            # return gdf_nezgode.set_index('geohash') # Vraća GeoDataFrame sa indeksom
             print("GeoHash još uvek nije implementiran u ovom primeru.")
             return None  # Placeholder
 
@@ -115,53 +250,86 @@ class AccidentWarningSystem:
             print(f"GREŠKA: Nepodržan tip indeksa '{tip_indeksa}'")
             return None
 
-    def _definisi_oblast_pretrage(self, trenutna_tacka):
+    def _definisi_oblast_pretrage(self, qx, qy):
         """
-        Definiše pravougaonu oblast (bounding box) ispred i oko vozila.
+        Definiše kvadratnu oblast (bounding box) oko centra ćelije mreže (qx, qy).
+        Vraća tuple (min_x, min_y, max_x, max_y) u LOKALNI_CRS.
         """
-        # Aproksimacija: 1 stepen latitude ≈ 111.1 km
-        # 1 stepen longitude ≈ 111.1 km * cos(latitude)
-        lat_stepen_u_km = 111.1
-        lon_stepen_u_km = lat_stepen_u_km * math.cos(math.radians(trenutna_tacka.y))
-
-        offset_lat = POGLED_UNAPRED_KM / lat_stepen_u_km
-        offset_lon = POGLED_UNAPRED_KM / lon_stepen_u_km
-
-        lon, lat = trenutna_tacka.x, trenutna_tacka.y
-        return box(lon - offset_lon, lat - offset_lat, lon + offset_lon, lat + offset_lat)
+        x, y = (qx + 0.5) * KORAK_MREZE_M, (qy + 0.5) * KORAK_MREZE_M
+        return x - _POLA_STRANICE_M, y - _POLA_STRANICE_M, x + _POLA_STRANICE_M, y + _POLA_STRANICE_M
 
     def proveri_opasnosti_na_deonici(self, trenutna_lokacija, trenutno_vreme):
         """
         Glavna javna metoda koja vrši sve provere za datu lokaciju i vreme.
         """
-        oblast_pretrage = self._definisi_oblast_pretrage(trenutna_lokacija)
-
-        # 1. Brzi prostorni upit pomoću indeksa
-        ids_kandidata = list(self.indeks.intersection(oblast_pretrage.bounds))
-        if not ids_kandidata:
-            return 0, 0, 0
+        # Tačka je u EPSG:4326; projektujemo je i zaokružujemo na ćeliju mreže (ključ keša)
+        x, y = _U_LOKALNI_CRS(trenutna_lokacija.x, trenutna_lokacija.y)
+        ids = self._kandidati(int(x // KORAK_MREZE_M), int(y // KORAK_MREZE_M))
+        return self._prebroj_nezgode(ids, trenutno_vreme)
 
-        nezgode_u_oblasti = self.gdf_nezgode.iloc[ids_kandidata]
-        # Fina provera preseka (jer R-tree vraća kandidate iz pravougaonika)
-        nezgode_u_oblasti = nezgode_u_oblasti[nezgode_u_oblasti.intersects(oblast_pretrage)]
+    def _pronadji_kandidate(self, qx, qy):
+        """
+        Brzi prostorni upit pomoću indeksa za ćeliju mreže (qx, qy).
+        Vraća NumPy niz pozicija nezgoda (samo za čitanje, jer se deli kroz keš).
+        """
+        oblast_pretrage = self._definisi_oblast_pretrage(qx, qy)
 
-        broj_ukupno = len(nezgode_u_oblasti)
-        if broj_ukupno == 0:
-            return 0, 0, 0
+        # Nezgode su tačke, a upit pravougaonikom za tačke vraća tačne pogotke,
+        # pa dodatna (GEOS) provera preseka nije potrebna
+        if isinstance(self.indeks, shapely.STRtree):
+            ids = self.indeks.query(shapely.box(*oblast_pretrage))
+        else:
+            # intersection_v vraća ID-jeve direktno kao NumPy niz, bez Python liste pogodaka
+            min_x, min_y, max_x, max_y = oblast_pretrage
+            ids, _ = self.indeks.intersection_v(np.array([[min_x, min_y]]), np.array([[max_x, max_y]]))
 
-        # 2. Vremenski upit - doba dana (koristimo pre-kalkulisanu kolonu 'sat')
-        sat = trenutno_vreme.hour
-        donja_granica_sati, gornja_granica_sati = (sat - VREMENSKI_OPSEG_SATI), (sat + VREMENSKI_OPSEG_SATI)
-        broj_doba_dana = len(
-            nezgode_u_oblasti[nezgode_u_oblasti['sat'].between(donja_granica_sati, gornja_granica_sati)])
+        ids.flags.writeable = False
+        return ids
 
-        # 3. Vremenski upit - doba godine (koristimo pre-kalkulisanu kolonu 'dan_u_godini')
-        dan = trenutno_vreme.dayofyear
-        donja_granica_dana, gornja_granica_dana = (dan - VREMENSKI_OPSEG_DANA), (dan + VREMENSKI_OPSEG_DANA)
-        broj_doba_godine = len(
-            nezgode_u_oblasti[nezgode_u_oblasti['dan_u_godini'].between(donja_granica_dana, gornja_granica_dana)])
+    def proveri_opasnosti_na_ruti(self, tacke, vremena):
+        """
+        Vrši proveru za sve tačke rute odjednom: svi pravougaonici idu u jedan grupni upit
+        indeksa, a pogoci se zatim dele po tačkama rute i prebrojavaju paralelno.
+        Vraća listu (ukupno, doba_dana, doba_godine) za svaku tačku.
+        """
+        if len(tacke) == 0:
+            return []
+
+        # Iste ćelije mreže kao u proveri_opasnosti_na_deonici, da rezultati budu identični
+        x, y = _U_LOKALNI_CRS(np.array([t.x for t in tacke]), np.array([t.y for t in tacke]))
+        min_x, min_y, max_x, max_y = self._definisi_oblast_pretrage(x // KORAK_MREZE_M, y // KORAK_MREZE_M)
+
+        if isinstance(self.indeks, shapely.STRtree):
+            # parovi[0] je indeks tačke rute, parovi[1] indeks nezgode; grupišemo po tački rute
+            parovi = self.indeks.query(shapely.box(min_x, min_y, max_x, max_y), predicate='intersects')
+            redosled = np.argsort(parovi[0], kind='stable')
+            ids = parovi[1][redosled]
+            granice = np.searchsorted(parovi[0][redosled], np.arange(len(tacke) + 1))
+        else:
+            # R-tree vraća pogotke svih pravougaonika nadovezane redom, uz broj pogodaka po svakom
+            ids, broj_po_oblasti = self.indeks.intersection_v(
+                np.column_stack((min_x, min_y)), np.column_stack((max_x, max_y)))
+            granice = np.concatenate(([0], np.cumsum(broj_po_oblasti))).astype(np.int64)
+
+        rezultat = _prebroj_prozore_po_tackama(
+            ids, granice, self._sat_arr, self._doy_arr,
+            np.array([v.hour for v in vremena]), VREMENSKI_OPSEG_SATI,
+            np.array([v.dayofyear for v in vremena]), VREMENSKI_OPSEG_DANA)
+        return [tuple(red) for red in rezultat.tolist()]
+
+    def _prebroj_nezgode(self, ids, trenutno_vreme):
+        """
+        Za pozicije nezgoda u oblasti vraća (ukupno, doba_dana, doba_godine).
+        """
+        if ids.size == 0:
+            return 0, 0, 0
 
-        return broj_ukupno, broj_doba_dana, broj_doba_godine
+        # Doba dana (+/- sati) i doba godine (+/- dana) se broje u jednom prolazu
+        # numba kernela nad pre-kalkulisanim nizovima '_sat_arr' i '_doy_arr'
+        ukupno, doba_dana, doba_godine = _prebroj_prozore(
+            ids, self._sat_arr, self._doy_arr,
+            trenutno_vreme.hour, VREMENSKI_OPSEG_SATI, trenutno_vreme.dayofyear, VREMENSKI_OPSEG_DANA)
+        return int(ukupno), int(doba_dana), int(doba_godine)
 
     @staticmethod
     def klasifikuj_opasnost(ukupno, doba_dana, doba_godine):
@@ -181,16 +349,17 @@ class AccidentWarningSystem:
             return "Bezbedno"
 
 
-def main_simulation():
+def main_simulation(demo=False):
     """
-    Glavna funkcija za pokretanje simulacije.
+    Glavna funkcija za pokretanje simulacije. Sa demo=True svaki korak se ispisuje
+    odmah, uz pauzu od 1 s radi preglednosti; inače se izveštaj ispisuje jednom, na kraju.
     """
     # !! STUDENT TREBA DA ZAMENI OVO SVOJOM PUTANJOM DO FAJLA !!
     putanja_do_fajla = 'nez-opendata-2021-20220125.xlsx'
 
     try:
         # Kreiramo instancu našeg sistema
-        sistem_upozorenja = AccidentWarningSystem(putanja_do_fajla, tip_indeksa='rtree')
+        sistem_upozorenja = AccidentWarningSystem(putanja_do_fajla, tip_indeksa='strtree')
     except Exception as e:
         print(f"Došlo je do greške pri inicijalizaciji: {e}")
         return
@@ -203,24 +372,30 @@ def main_simulation():
         Point(20.25, 45.00), Point(20.10, 45.15), Point(19.83, 45.26)
     ]
 
-    print("\n--- Početak simulacije vožnje ---")
-    for i, tacka in enumerate(ruta_voznje):
-        # Dobijanje trenutne lokacije i vremena iz simulacije
-        trenutna_lokacija = tacka
-        trenutno_vreme = pd.Timestamp.now()  # U pravoj simulaciji, ovo vreme bi se takođe menjalo
+    # Vreme za svaku tačku rute (u pravoj simulaciji, ovo vreme bi se takođe menjalo)
+    vremena = [pd.Timestamp.now() for _ in ruta_voznje]
 
-        # Pozivamo naš sistem da izvrši proveru
-        u, dd, dg = sistem_upozorenja.proveri_opasnosti_na_deonici(trenutna_lokacija, trenutno_vreme)
+    # Pozivamo naš sistem da izvrši proveru za celu rutu jednim grupnim upitom
+    rezultati = sistem_upozorenja.proveri_opasnosti_na_ruti(ruta_voznje, vremena)
 
-        # Klasifikujemo i ispisujemo rezultat
-        nivo_opasnosti = sistem_upozorenja.klasifikuj_opasnost(u, dd, dg)
+    print("\n--- Početak simulacije vožnje ---")
+    izvestaj = []
+    for i, (tacka, (u, dd, dg)) in enumerate(zip(ruta_voznje, rezultati)):
 
-        print(f"\nKorak {i + 1}: Lokacija ({tacka.y:.4f}, {tacka.x:.4f})")
-        print(f"Analiza deonice -> Ukupno: {u}, U isto doba dana: {dd}, U isto doba godine: {dg}")
-        print(f"NIVO OPASNOSTI: {nivo_opasnosti}")
+        # Klasifikujemo rezultat; ispis se skuplja, da petlja ne čeka na stdout
+        nivo_opasnosti = sistem_upozorenja.klasifikuj_opasnost(u, dd, dg)
+        korak = (f"\nKorak {i + 1}: Lokacija ({tacka.y:.4f}, {tacka.x:.4f})\n"
+                 f"Analiza deonice -> Ukupno: {u}, U isto doba dana: {dd}, U isto doba godine: {dg}\n"
+                 f"NIVO OPASNOSTI: {nivo_opasnosti}")
 
-        time.sleep(1)  # Pauza radi preglednosti
+        if demo:
+            print(korak)
+            time.sleep(1)  # Pauza radi preglednosti
+        else:
+            izvestaj.append(korak)
 
+    if izvestaj:
+        print("\n".join(izvestaj))
     print("\n--- Simulacija završena ---")
 
 